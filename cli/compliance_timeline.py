@@ -1,12 +1,14 @@
 import argparse
 import os
 import sqlite3
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from cli.reporting import ensure_account_index, get_template
 
 
 def build_timeline(db: str, account: str):
     con = sqlite3.connect(db)
     con.row_factory = sqlite3.Row
+    ensure_account_index(con)
     rows = con.execute(
         "SELECT id, subject, sender_email, sent_at FROM messages WHERE account_tag=? ORDER BY sent_at",
         (account,),
@@ -16,11 +18,7 @@ def build_timeline(db: str, account: str):
 
 def render_timeline(db: str, account: str, out_path: str):
     rows = build_timeline(db, account)
-    env = Environment(
-        loader=FileSystemLoader("reports/templates"),
-        autoescape=select_autoescape(["html", "xml"]),
-    )
-    tpl = env.get_template("compliance_timeline.html")
+    tpl = get_template("compliance_timeline.html")
     html = tpl.render(account=account, items=rows)
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
     with open(out_path, "w", encoding="utf-8") as f:
@@ -4,21 +4,26 @@ import os
 import sqlite3
 
 
+EXPORT_TABLES = ("messages", "attachments", "events", "entities", "account_tags")
+
+
 def export_tables(db: str, out_dir: str):
     os.makedirs(out_dir, exist_ok=True)
     con = sqlite3.connect(db)
-    con.row_factory = sqlite3.Row
-    for tbl in ["messages", "attachments", "events", "entities", "account_tags"]:
-        rows = con.execute(f"SELECT * FROM {tbl}").fetchall()
+    for tbl in EXPORT_TABLES:
+        # Identifiers can't be bound as parameters; only the whitelisted names above are interpolated.
+        cols = [r[1] for r in con.execute(f"PRAGMA table_info({tbl})")]
+        select = ", ".join(f'"{c}"' for c in cols) or "*"
+        # Stream tuples straight from the cursor; nothing is materialized per table.
+        cur = con.execute(f"SELECT {select} FROM {tbl}")
         out = os.path.join(out_dir, f"{tbl}.csv")
-        with open(out, "w", newline="", encoding="utf-8") as f:
-            if rows:
-                w = csv.DictWriter(f, fieldnames=rows[0].keys())
-                w.writeheader()
-                for r in rows:
-                    w.writerow(dict(r))
-            else:
-                f.write("")
+        with open(out, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+            first = cur.fetchone()
+            if first is not None:
+                w = csv.writer(f)
+                w.writerow(cols)
+                w.writerow(first)
+                w.writerows(cur)
         print(f"Exported {tbl} -> {out}")
 
 
@@ -1,22 +1,20 @@
 import argparse
 import os
 import sqlite3
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from cli.reporting import ensure_account_index, get_template
 
 
 def render_dossier(db: str, account: str, out_path: str):
     con = sqlite3.connect(db)
     con.row_factory = sqlite3.Row
+    ensure_account_index(con)
     msgs = con.execute(
-        "SELECT * FROM messages WHERE account_tag = ? ORDER BY sent_at DESC LIMIT 500",
+        "SELECT id, sent_at, sender_email, subject FROM messages WHERE account_tag = ? ORDER BY sent_at DESC LIMIT 500",
         (account,),
     ).fetchall()
 
-    env = Environment(
-        loader=FileSystemLoader("reports/templates"),
-        autoescape=select_autoescape(["html", "xml"]),
-    )
-    tpl = env.get_template("dossier.html")
+    tpl = get_template("dossier.html")
     html = tpl.render(account=account, messages=msgs)
     os.makedirs(os.path.dirname(out_path), exist_ok=True)
     with open(out_path, "w", encoding="utf-8") as f:
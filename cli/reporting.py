@@ -0,0 +1,31 @@
+import functools
+import sqlite3
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+
+# Shared by the report CLIs: one Environment, so each template is compiled once per process.
+_ENV = Environment(
+    loader=FileSystemLoader("reports/templates"),
+    autoescape=select_autoescape(["html", "xml"]),
+    auto_reload=False,
+    cache_size=400,
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_template(name: str):
+    return _ENV.get_template(name)
+
+
+def ensure_account_index(con: sqlite3.Connection) -> None:
+    # Covering index for WHERE account_tag=? ORDER BY sent_at (either direction): the
+    # timeline and dossier columns live in the index (rowid is implicit), so neither
+    # query touches the messages table.
+    try:
+        con.execute(
+            "CREATE INDEX IF NOT EXISTS idx_messages_account_timeline "
+            "ON messages(account_tag, sent_at, sender_email, subject)"
+        )
+        con.commit()
+    except sqlite3.OperationalError:
+        pass
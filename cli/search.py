@@ -1,24 +1,89 @@
 import argparse
+import re
 import sqlite3
 from rich.table import Table
 from rich.console import Console
 
 
+# External-content FTS5 index over messages(subject, body). The trigram tokenizer
+# gives index-backed substring matching; triggers keep it in sync with ingest.
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    subject, body, content='messages', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, subject, body) VALUES (new.id, new.subject, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, subject, body) VALUES ('delete', old.id, old.subject, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, subject, body) VALUES ('delete', old.id, old.subject, old.body);
+    INSERT INTO messages_fts(rowid, subject, body) VALUES (new.id, new.subject, new.body);
+END;
+"""
+
+_FTS_SQL = (
+    "SELECT m.id, m.sent_at, m.sender_email, m.subject, m.account_tag "
+    "FROM messages_fts f JOIN messages m ON m.id = f.rowid "
+    "WHERE messages_fts MATCH ? "
+    "ORDER BY m.sent_at DESC LIMIT ?"
+)
+
+_LIKE_SQL = (
+    "SELECT id, sent_at, sender_email, subject, account_tag FROM messages "
+    "WHERE (subject LIKE ? OR body LIKE ?) "
+    "ORDER BY sent_at DESC LIMIT ?"
+)
+
+
+def ensure_fts(con: sqlite3.Connection) -> bool:
+    """Create and populate `messages_fts` on first use. Returns False if FTS5/trigram is unavailable."""
+    try:
+        if con.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'").fetchone():
+            return True
+        con.executescript(_FTS_SCHEMA)
+        con.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+        con.commit()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+# Quoted phrase or bareword in an FTS5 query; uppercase AND/OR/NOT are operators, not terms.
+_FTS_TERM_RE = re.compile(r'"([^"]*)"|([^\s"()]+)')
+_FTS_OPERATORS = frozenset(("AND", "OR", "NOT"))
+
+
+def _trigram_safe(query: str) -> bool:
+    # A trigram MATCH silently drops or misses any term under 3 chars (e.g. "PO", "Q3") instead of raising
+    terms = [m.group(1) if m.group(1) is not None else m.group(2) for m in _FTS_TERM_RE.finditer(query)]
+    terms = [t for t in terms if t not in _FTS_OPERATORS]
+    return bool(terms) and all(len(t) >= 3 for t in terms)
+
+
+def _query(con: sqlite3.Connection, query: str, limit: int):
+    # Trigram MATCH only when every term has 3+ chars; FTS syntax errors (e.g. bare punctuation) fall back to LIKE.
+    fts = ensure_fts(con)
+    if fts and _trigram_safe(query):
+        try:
+            return con.execute(_FTS_SQL, (query, limit)).fetchall()
+        except sqlite3.OperationalError:
+            pass
+    # Substring scan over subject and body; a subject-prefix index seek would drop body and mid-subject hits.
+    like = f"%{query}%"
+    return con.execute(_LIKE_SQL, (like, like, limit)).fetchall()
+
+
 def search(db: str, query: str, limit: int = 50):
     con = sqlite3.connect(db)
-    con.row_factory = sqlite3.Row
-    sql = (
-        "SELECT id, sent_at, sender_email, subject, account_tag FROM messages "
-        "WHERE (subject LIKE ? OR body LIKE ?) "
-        "ORDER BY sent_at DESC LIMIT ?"
-    )
-    like = f"%{query}%"
-    rows = con.execute(sql, (like, like, limit)).fetchall()
+    rows = _query(con, query, limit)
     tbl = Table(title=f"Search: {query}")
     for col in ["id", "sent_at", "sender_email", "account_tag", "subject"]:
         tbl.add_column(col)
-    for r in rows:
-        tbl.add_row(str(r["id"] or ""), r["sent_at"] or "", r["sender_email"] or "", r["account_tag"] or "", (r["subject"] or "")[:80])
+    # plain tuples in SELECT order: id, sent_at, sender_email, subject, account_tag
+    for mid, sent_at, sender_email, subject, account_tag in rows:
+        tbl.add_row(str(mid or ""), sent_at or "", sender_email or "", account_tag or "", (subject or "")[:80])
     Console().print(tbl)
 
 
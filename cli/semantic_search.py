@@ -1,4 +1,5 @@
 import argparse
+import functools
 import sqlite3
 from rich.table import Table
 from rich.console import Console
@@ -11,23 +12,36 @@ def load_cfg(path: str):
         return yaml.safe_load(f) or {}
 
 
+@functools.lru_cache(maxsize=4)
+def _get_indexer(model_name: str, index_path: str) -> EmbeddingIndexer:
+    # Keep the model and FAISS index resident across queries in a long-lived process.
+    return EmbeddingIndexer(model_name, index_path, mmap=True)
+
+
 def semantic_search(db: str, cfg_path: str, query: str, k: int = 10):
     cfg = load_cfg(cfg_path)
     sem = cfg.get("semantic", {})
     if not sem.get("enabled"):
         print("Semantic layer disabled in config.")
         return
-    indexer = EmbeddingIndexer(sem.get("model_name"), sem.get("faiss_index"))
+    indexer = _get_indexer(sem.get("model_name"), sem.get("faiss_index"))
     results = indexer.search(query, k)
     con = sqlite3.connect(db)
-    con.row_factory = sqlite3.Row
     table = Table(title=f"Semantic results: '{query}'")
     for col in ["score", "sent_at", "sender_email", "subject", "account_tag"]:
         table.add_column(col)
-    for mid, score in results:
-        r = con.execute("SELECT sent_at, sender_email, subject, account_tag FROM messages WHERE id=?", (mid,)).fetchone()
-        if r:
-            table.add_row(f"{score:.3f}", r["sent_at"] or "", r["sender_email"] or "", (r["subject"] or "")[:80], r["account_tag"] or "")
+    scores = {mid: score for mid, score in results}
+    rows = []
+    if scores:
+        placeholders = ",".join("?" * len(scores))
+        rows = con.execute(
+            f"SELECT id, sent_at, sender_email, subject, account_tag FROM messages WHERE id IN ({placeholders})",
+            list(scores),
+        ).fetchall()
+        # IN () returns rows in table order; restore FAISS rank
+        rows.sort(key=lambda r: -scores[r[0]])
+    for mid, sent_at, sender_email, subject, account_tag in rows:
+        table.add_row(f"{scores[mid]:.3f}", sent_at or "", sender_email or "", (subject or "")[:80], account_tag or "")
     Console().print(table)
 
 
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import email
+import email.message
+import email.policy
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import fast_mail_parser as _fmp  # type: ignore
+except ImportError:
+    _fmp = None
+
+
+class ParsedMsg:
+    """Read-only view over a `fast_mail_parser` result.
+
+    - Mirrors the subset of `email.message.Message` that ingest reads: `get`, `get_all`, `is_multipart`.
+    - Header names are case-insensitive; values arrive already RFC 2047-decoded.
+    - `text_plain` / `text_html` hold the decoded body parts, so no multipart walk is needed.
+    """
+
+    __slots__ = ("_headers", "subject", "text_plain", "text_html", "attachments")
+
+    def __init__(self, headers: Dict[str, Any], subject: Optional[str], text_plain: List[str], text_html: List[str], attachments: List[Any]):
+        self._headers: Dict[str, List[str]] = {}
+        for name, vals in headers.items():
+            # fast_mail_parser >= 0.3 yields a list per header, older releases a single str
+            self._headers.setdefault(name.lower(), []).extend(vals if isinstance(vals, list) else [vals])
+        self.subject = subject
+        self.text_plain = text_plain
+        self.text_html = text_html
+        self.attachments = attachments
+
+    def get(self, name: str, default: Any = None) -> Any:
+        vals = self._headers.get(name.lower())
+        return vals[0] if vals else default
+
+    def get_all(self, name: str, default: Any = None) -> Any:
+        vals = self._headers.get(name.lower())
+        return list(vals) if vals else default
+
+    def is_multipart(self) -> bool:
+        return (self.get("Content-Type") or "").lower().startswith("multipart/")
+
+
+def parse_bytes(raw: bytes) -> Union[ParsedMsg, email.message.Message]:
+    """Parse an RFC 822 message, preferring the Rust-backed parser and falling back to the stdlib."""
+    if _fmp is not None:
+        try:
+            m = _fmp.parse_email(raw)
+            return ParsedMsg(m.headers, m.subject, list(m.text_plain or []), list(m.text_html or []), list(m.attachments or []))
+        except Exception:
+            pass
+    return email.message_from_bytes(raw, policy=email.policy.default)
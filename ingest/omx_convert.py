@@ -1,33 +1,86 @@
 import os
 import re
+import html
 import json
 import hashlib
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, Any, Iterable, Tuple, Optional, List
-from xml.etree import ElementTree as ET
+
+try:
+    # lxml walks the tree in C; recover=True tolerates the odd malformed OMX export.
+    from lxml import etree as ET  # type: ignore
+    _ITERPARSE_KW: Dict[str, Any] = {"huge_tree": True, "recover": True}
+except ImportError:
+    from xml.etree import ElementTree as ET
+    _ITERPARSE_KW = {}
 
 from db.util import upsert_message, insert_attachment
 
-EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
 
+try:
+    from selectolax.lexbor import LexborHTMLParser as _HTMLParser  # type: ignore
+except ImportError:
+    _HTMLParser = None
 
-def _text(n: Optional[ET.Element]) -> str:
-    if n is None:
-        return ""
-    return (n.text or "").strip()
+try:
+    # RE2 scans in linear time; same findall/search API as `re` for this pattern.
+    import re2 as _email_re  # type: ignore
+except ImportError:
+    _email_re = re
 
+EMAIL_RE = _email_re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
 
-def _flatten_xml(root: ET.Element) -> Dict[str, List[str]]:
-    flat: Dict[str, List[str]] = {}
-    for elem in root.iter():
-        key = elem.tag.split('}')[-1].lower()
-        val = (elem.text or '').strip()
-        if not val:
+_SUBJECT_KEYS = ("subject", "mssubject", "itemsubject", "title", "opfmessagecopysubject")
+_BODY_KEYS = ("body", "textbody", "plaintext", "preview", "bodypreview", "content", "opfmessagecopybody")
+_SENT_KEYS = ("datesent", "datetimesent", "sent", "date", "receivedtime", "opfmessagecopyreceivedtime", "opfmessagecopysenttime")
+_SENDER_KEYS = ("from", "sender", "fromname", "fromemailaddress", "opfmessagecopysenderaddress")
+_TO_KEYS = ("to", "torecipients", "recipient", "toaddresses", "toemailaddress")
+_CC_KEYS = ("cc", "ccrecipients", "ccaddresses", "ccemailaddress")
+_BCC_KEYS = ("bcc", "bccrecipients", "bccaddresses", "bccemailaddress")
+_FLAT_KEYS = frozenset(_SUBJECT_KEYS + _BODY_KEYS + _SENT_KEYS + _SENDER_KEYS + _TO_KEYS + _CC_KEYS + _BCC_KEYS)
+
+# Sibling files that may carry the message body: .com_0000 .. .com_0010 plus plain/HTML/RTF.
+_PART_SUFFIXES = tuple(f'.com_{i:04d}' for i in range(11)) + ('.html', '.htm', '.rtf', '.txt')
+
+_SCRIPT_RE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s*\n\s*')
+_HTML_HINT_RE = re.compile(r'<html|</p>', re.IGNORECASE)
+
+
+def _flatten_xml(path: str) -> Tuple[Dict[str, List[str]], List[str], Optional[str]]:
+    # Single streaming pass: keep text only for tags we read, attribute values of
+    # <emailAddress> elements, and the first email-like string anywhere in the
+    # document (last-resort sender).
+    flat: Dict[str, List[str]] = defaultdict(list)
+    attr_blobs: List[str] = []
+    first_email: Optional[str] = None
+    for _event, elem in ET.iterparse(path, events=("end",), **_ITERPARSE_KW):
+        tag = elem.tag
+        if not isinstance(tag, str):
+            # lxml reports comments/processing instructions with a callable tag
             continue
-        flat.setdefault(key, []).append(val)
-    return flat
+        key = tag.rpartition('}')[2].lower()
+        if key == 'emailaddress':
+            attr_blobs.extend(elem.attrib.values())
+        val = (elem.text or '').strip()
+        if val:
+            if key in _FLAT_KEYS:
+                flat[key].append(val)
+            if first_email is None:
+                m = EMAIL_RE.search(val)
+                if m:
+                    first_email = m.group(0)
+        elem.clear()
+    return flat, attr_blobs, first_email
 
 
-def _pick(flat: Dict[str, List[str]], keys: List[str]) -> Optional[str]:
+def _pick(flat: Dict[str, List[str]], keys: Iterable[str]) -> Optional[str]:
     for k in keys:
         vals = flat.get(k)
         if vals:
@@ -35,72 +88,52 @@ def _pick(flat: Dict[str, List[str]], keys: List[str]) -> Optional[str]:
     return None
 
 
-def _collect_emails(flat: Dict[str, List[str]], keys: List[str]) -> str:
-    out: List[str] = []
-    for k in keys:
-        for v in flat.get(k, []):
-            out.extend(EMAIL_RE.findall(v))
-    # de-dupe preserving order
-    seen = set()
-    uniq = []
-    for e in out:
-        if e not in seen:
-            seen.add(e)
-            uniq.append(e)
-    return ";".join(uniq)
+def _collect_emails(flat: Dict[str, List[str]], keys: Iterable[str]) -> str:
+    buf = "\n".join(v for k in keys for v in flat.get(k, ()))
+    # dict.fromkeys de-dupes preserving order
+    return ";".join(dict.fromkeys(EMAIL_RE.findall(buf)))
+
+
+def _external_id(path: str, subject: Optional[str]) -> str:
+    # upsert_message dedupes on external_id, so the digest must stay SHA-1 hex or
+    # re-ingesting an existing DB would duplicate every OMX message.
+    return hashlib.sha1((path + (subject or "")).encode("utf-8", "ignore"), usedforsecurity=False).hexdigest()
 
 
 def parse_message_xml(path: str) -> Optional[Dict[str, Any]]:
     try:
-        tree = ET.parse(path)
-        root = tree.getroot()
+        flat, attr_blobs, first_email = _flatten_xml(path)
     except Exception:
         return None
-    flat = _flatten_xml(root)
 
-    subject = _pick(flat, ["subject", "mssubject", "itemsubject", "title", "opfmessagecopysubject"]) or None
-    body = _pick(flat, ["body", "textbody", "plaintext", "preview", "bodypreview", "content", "opfmessagecopybody"]) or None
-    sent = _pick(flat, ["datesent", "datetimesent", "sent", "date", "receivedtime", "opfmessagecopyreceivedtime", "opfmessagecopysenttime"]) or None
-    sender_block = _pick(flat, ["from", "sender", "fromname", "fromemailaddress", "opfmessagecopysenderaddress"]) or ""
+    subject = _pick(flat, _SUBJECT_KEYS) or None
+    body = _pick(flat, _BODY_KEYS) or None
+    sent = _pick(flat, _SENT_KEYS) or None
+    sender_block = _pick(flat, _SENDER_KEYS) or ""
     sender_email = None
     m = EMAIL_RE.search(sender_block)
     if m:
         sender_email = m.group(0)
     if not sender_email:
         # try attributes like <emailAddress OPFContactEmailAddressAddress="...">
-        try:
-            tree = ET.parse(path)
-            for el in tree.iter():
-                if el.tag.split('}')[-1].lower() == 'emailaddress':
-                    for attr_val in el.attrib.values():
-                        m = EMAIL_RE.search(attr_val)
-                        if m:
-                            sender_email = m.group(0)
-                            break
-                if sender_email:
-                    break
-        except Exception:
-            pass
+        for attr_val in attr_blobs:
+            m = EMAIL_RE.search(attr_val)
+            if m:
+                sender_email = m.group(0)
+                break
     if not sender_email:
         # final fallback: any email-like text in doc
-        for k, vals in flat.items():
-            for v in vals:
-                m = EMAIL_RE.search(v)
-                if m:
-                    sender_email = m.group(0)
-                    break
-            if sender_email:
-                break
+        sender_email = first_email
 
-    tos = _collect_emails(flat, ["to", "torecipients", "recipient", "toaddresses", "toemailaddress"])
-    ccs = _collect_emails(flat, ["cc", "ccrecipients", "ccaddresses", "ccemailaddress"])
-    bccs = _collect_emails(flat, ["bcc", "bccrecipients", "bccaddresses", "bccemailaddress"])
+    tos = _collect_emails(flat, _TO_KEYS)
+    ccs = _collect_emails(flat, _CC_KEYS)
+    bccs = _collect_emails(flat, _BCC_KEYS)
 
     if not subject and not body:
         return None
 
     rec = {
-        "external_id": hashlib.sha1((path + (subject or "")).encode("utf-8", "ignore")).hexdigest(),
+        "external_id": _external_id(path, subject),
         "thread_id": None,
         "folder": None,
         "sender_name": sender_email,
@@ -126,7 +159,10 @@ def _decode_bytes(b: bytes) -> str:
         return ""
     try:
         return b.decode("utf-8")
-    except Exception:
+    except UnicodeDecodeError as e:
+        # A capped read can split the final multi-byte sequence; that is still UTF-8.
+        if e.reason == "unexpected end of data":
+            return b[:e.start].decode("utf-8")
         try:
             import chardet  # type: ignore
             enc = chardet.detect(b).get("encoding") or "latin-1"
@@ -135,31 +171,47 @@ def _decode_bytes(b: bytes) -> str:
             return b.decode("latin-1", "ignore")
 
 
+def _html_to_text(text: str) -> str:
+    if _HTMLParser is not None:
+        try:
+            tree = _HTMLParser(text)
+            tree.strip_tags(['script', 'style'])
+            return tree.text(separator='\n')
+        except Exception:
+            pass
+    # Same shape as get_text('\n'): one text run per line.
+    text = _TAG_RE.sub('\n', _SCRIPT_RE.sub('', text))
+    return _WS_RE.sub('\n', html.unescape(text)).strip()
+
+
 def _collect_body_from_parts(xml_path: str, max_chars: int = 10000) -> str:
     # Heuristic: concatenate readable text from sibling part files (.com_000*, .html, .htm, .rtf)
     body_parts: List[str] = []
     d = os.path.dirname(xml_path)
     try:
-        for fn in sorted(os.listdir(d)):
-            fl = fn.lower()
-            if fl.endswith(('.com_0000', '.com_0001', '.com_0002', '.com_0003', '.com_0004', '.com_0005', '.com_0006', '.com_0007', '.com_0008', '.com_0009', '.com_0010')) or fl.endswith(('.html', '.htm', '.rtf', '.txt')):
-                p = os.path.join(d, fn)
-                if not os.path.isfile(p):
+        # DirEntry caches the type from the directory read, saving a stat per file
+        with os.scandir(d) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        total = 0
+        for entry in entries:
+            need = max_chars - total
+            if need <= 0:
+                break
+            fl = entry.name.lower()
+            if fl.endswith(_PART_SUFFIXES):
+                p = entry.path
+                if not entry.is_file():
                     continue
                 try:
                     with open(p, 'rb') as f:
-                        raw = f.read(200000)  # 200KB per part cap
+                        # 200KB per part cap; read only what the remaining budget could use
+                        raw = f.read(min(200000, need * 4 + 4096))
                     text = _decode_bytes(raw)
-                    # If looks like HTML, strip tags to text
-                    if '<html' in text.lower() or '</p>' in text.lower():
-                        try:
-                            from bs4 import BeautifulSoup  # type: ignore
-                            text = BeautifulSoup(text, 'html.parser').get_text('\n')
-                        except Exception:
-                            pass
+                    # If looks like HTML, strip tags to text (case-insensitive scan, no lowered copy)
+                    if _HTML_HINT_RE.search(text):
+                        text = _html_to_text(text)
                     body_parts.append(text)
-                    if sum(len(x) for x in body_parts) >= max_chars:
-                        break
+                    total += len(text)
                 except Exception:
                     continue
     except Exception:
@@ -173,52 +225,154 @@ def _find_attachment_candidates(xml_path: str, limit: int = 10) -> List[Tuple[st
     out: List[Tuple[str, int]] = []
     base = os.path.dirname(xml_path)
     att_dir = os.path.join(base, 'com.microsoft.__Attachments')
-    if os.path.isdir(att_dir):
-        try:
-            for fn in sorted(os.listdir(att_dir))[:limit]:
-                p = os.path.join(att_dir, fn)
-                if os.path.isfile(p) and not fn.lower().endswith('.xml'):
-                    try:
-                        sz = os.path.getsize(p)
-                    except Exception:
-                        sz = 0
-                    out.append((fn, sz))
-        except Exception:
-            pass
+    try:
+        with os.scandir(att_dir) as it:
+            entries = sorted(it, key=lambda e: e.name)[:limit]
+    except OSError:
+        # missing (the common case) or not a directory
+        return out
+    try:
+        for entry in entries:
+            if entry.is_file() and not entry.name.lower().endswith('.xml'):
+                try:
+                    sz = entry.stat().st_size
+                except Exception:
+                    sz = 0
+                out.append((entry.name, sz))
+    except Exception:
+        pass
     return out
 
 
-def ingest_outlook_mac_dir(root_dir: str, conn, cfg: Dict[str, Any], checkpoint_path: Optional[str]) -> int:
+def parse_message_xml_with_body(path: str) -> Optional[Tuple[Dict[str, Any], List[Tuple[str, int]]]]:
+    """Parse one OMX message with its sibling body parts and attachment names.
+
+    Touches only the filesystem, so it is safe to run in a worker process.
+    """
+    rec = parse_message_xml(path)
+    if not rec:
+        return None
+    # If body is empty, try to reconstruct from sibling parts
+    if not rec.get('body'):
+        reconstructed = _collect_body_from_parts(path)
+        if reconstructed:
+            rec['body'] = reconstructed
+    return rec, _find_attachment_candidates(path)
+
+
+def _iter_message_paths(root_dir: str, processed: set) -> Iterable[str]:
+    for dirpath, _, filenames in os.walk(root_dir):
+        for fn in filenames:
+            fl = fn.lower()
+            if not fl.endswith('.xml'):
+                continue
+            if fl in ("categories.xml",):
+                continue
+            path = os.path.join(dirpath, fn)
+            if path in processed:
+                continue
+            yield path
+
+
+_BULK_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-200000",
+)
+
+
+def tune_connection(conn) -> None:
+    """Switch `conn` to WAL with relaxed fsync for bulk loads (idempotent, best effort)."""
+    try:
+        # journal_mode cannot change inside an open transaction
+        conn.commit()
+        for pragma in _BULK_PRAGMAS:
+            conn.execute(pragma)
+    except Exception:
+        pass
+
+
+def _write_checkpoint(checkpoint_path: str, state: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+    tmp = checkpoint_path + '.tmp'
+    data = orjson.dumps(state) if orjson else json.dumps(state).encode('utf-8')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, checkpoint_path)
+
+
+def _read_checkpoint(checkpoint_path: str) -> Dict[str, Any]:
+    with open(checkpoint_path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def _begin(conn) -> None:
+    # One explicit write transaction per batch: takes the write lock up front instead
+    # of upgrading from a deferred read transaction on the first INSERT.
+    if not getattr(conn, 'in_transaction', True):
+        conn.execute('BEGIN IMMEDIATE')
+
+
+def _commit(conn, checkpoint_path: Optional[str], state: Dict[str, Any]) -> None:
+    # The checkpoint only ever records rows that have been committed, so a failed commit propagates.
+    conn.commit()
+    if checkpoint_path:
+        _write_checkpoint(checkpoint_path, state)
+
+
+def _run_chunk(fn, items: List[Any]) -> List[Any]:
+    return [fn(x) for x in items]
+
+
+def bounded_map(executor, fn, items: List[Any], workers: int, chunksize: int = 32) -> Iterable[Any]:
+    """Ordered `executor.map(fn, items, chunksize=...)` with at most `2 * workers` chunks in flight.
+
+    `executor.map` submits every chunk up front, so finished results pile up in the parent whenever
+    the single writer falls behind; here a new chunk is submitted only as the oldest one is drained.
+    """
+    pending: deque = deque()
+    chunks = (items[i:i + chunksize] for i in range(0, len(items), chunksize))
+    for chunk in chunks:
+        pending.append(executor.submit(_run_chunk, fn, chunk))
+        if len(pending) >= 2 * workers:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def ingest_outlook_mac_dir(root_dir: str, conn, cfg: Dict[str, Any], checkpoint_path: Optional[str], jobs: Optional[int] = None) -> int:
     state = {}
     processed = set()
     if checkpoint_path and os.path.exists(checkpoint_path):
         try:
-            state = json.load(open(checkpoint_path, 'r', encoding='utf-8'))
+            state = _read_checkpoint(checkpoint_path)
             processed = set((state.get('omx_processed') or {}).keys())
         except Exception:
             state = {}
 
+    tune_connection(conn)
+    # Parsing fans out to worker processes; this process stays the only SQLite writer.
+    paths = list(_iter_message_paths(root_dir, processed))
+    workers = jobs or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(paths) > 1 else None
+    if executor:
+        results = bounded_map(executor, parse_message_xml_with_body, paths, workers)
+    else:
+        results = map(parse_message_xml_with_body, paths)
+
     count = 0
-    for dirpath, _, filenames in os.walk(root_dir):
-        for fn in filenames:
-            if not fn.lower().endswith('.xml'):
-                continue
-            if fn.lower() in ("categories.xml",):
-                continue
-            path = os.path.join(dirpath, fn)
-            if path in processed:
-                continue
-            rec = parse_message_xml(path)
-            if not rec:
+    try:
+        for path, parsed in zip(paths, results):
+            if not parsed:
                 continue
-            # If body is empty, try to reconstruct from sibling parts
-            if not rec.get('body'):
-                reconstructed = _collect_body_from_parts(path)
-                if reconstructed:
-                    rec['body'] = reconstructed
+            rec, attachments = parsed
+            _begin(conn)
             mid = upsert_message(conn, rec)
             # Attachments (names/sizes only)
-            for fn, sz in _find_attachment_candidates(path):
+            for fn, sz in attachments:
                 try:
                     insert_attachment(conn, mid, fn, None, sz, None)
                 except Exception:
@@ -226,19 +380,12 @@ def ingest_outlook_mac_dir(root_dir: str, conn, cfg: Dict[str, Any], checkpoint_
             # minimal tagging/partners can be applied later; for now rely on post-pass or search
             if checkpoint_path:
                 state.setdefault('omx_processed', {})[path] = mid
-                tmp = checkpoint_path + '.tmp'
-                os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
-                with open(tmp, 'w', encoding='utf-8') as f:
-                    json.dump(state, f)
-                os.replace(tmp, checkpoint_path)
             count += 1
             if count % 1000 == 0:
-                try:
-                    conn.commit()
-                except Exception:
-                    pass
-    try:
-        conn.commit()
-    except Exception:
-        pass
+                _commit(conn, checkpoint_path, state)
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        # Runs on clean exit and on interruption, so a resume skips everything done so far.
+        _commit(conn, checkpoint_path, state)
     return count
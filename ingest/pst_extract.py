@@ -1,4 +1,5 @@
 import argparse
+import base64
 import email
 import email.policy
 import hashlib
@@ -7,25 +8,37 @@ import os
 import platform
 import re
 import zipfile
-import mailbox
+from array import array
+import mmap
 import shutil
 import subprocess
 import sys
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import groupby
 from email.header import decode_header, make_header
 from email.utils import parsedate_to_datetime
 from typing import Optional, Dict, Any, Iterable, Tuple, List
 
-from db.util import connect, upsert_message, insert_attachment, tag_message, add_entities
-from nlp.entities import extract_entities
+from db.util import connect, upsert_message, insert_attachment, insert_event, tag_message, add_entities
+from nlp.entities import extract_entities, extract_entities_batch
 from nlp.embeddings import EmbeddingIndexer
 from dateutil import parser as dateparse
-from ingest.omx_convert import ingest_outlook_mac_dir
+from ingest.omx_convert import bounded_map, ingest_outlook_mac_dir, tune_connection
+from ingest.fast_parse import parse_bytes
+
+try:
+    import ciso8601  # type: ignore
+except ImportError:
+    ciso8601 = None
 
 
 def safe_decode(s: Optional[str]) -> str:
     if not s:
         return ""
+    if "=?" not in s:
+        # no RFC 2047 encoded-words; decode_header/make_header would return it unchanged
+        return s
     try:
         return str(make_header(decode_header(s)))
     except Exception:
@@ -37,66 +50,177 @@ def iso(dt: Optional[datetime]) -> Optional[str]:
         return None
     try:
         if dt.tzinfo:
-            return dt.astimezone(datetime.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
         return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
     except Exception:
         return None
 
 
+# Quoted display name, comment, angle-addr, address separator, or a bare local@domain token
+_ADDR_RE = re.compile(r'"(?:[^"\\]|\\.)*"|\([^()]*\)|<([^<>]*)>|([,;])|([^\s,;<>"()]+@[^\s,;<>"()]+)')
+
+
+def parse_addrs(header: Optional[str]) -> List[str]:
+    # All addresses in one header value (parseaddr only returned the first).
+    # Quoted names and comments are skipped; an angle-addr wins over any bare token beside it.
+    out: List[str] = []
+    angle = bare = None
+    for m in _ADDR_RE.finditer(header or ""):
+        if m.group(1) is not None:
+            angle = m.group(1).strip()
+        elif m.group(2):
+            if angle or bare:
+                out.append(angle or bare)
+            angle = bare = None
+        elif m.group(3) and not bare:
+            bare = m.group(3)
+    if angle or bare:
+        out.append(angle or bare)
+    return list(dict.fromkeys(out))
+
+
+def _addr_list(msg: email.message.Message, name: str) -> List[str]:
+    vals = msg.get_all(name)
+    if not vals:
+        return []
+    if len(vals) == 1:
+        return parse_addrs(vals[0])
+    return [a for v in vals for a in parse_addrs(v)]
+
+
+def parse_date(date_hdr: Optional[str]) -> Optional[datetime]:
+    if not date_hdr:
+        return None
+    if ciso8601 is not None and date_hdr[:4].isdigit():
+        try:
+            return ciso8601.parse_datetime(date_hdr.strip())
+        except ValueError:
+            pass
+    try:
+        return parsedate_to_datetime(date_hdr)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _policy_header(name: str, value: Any) -> str:
+    # Idempotent on stdlib values; normalizes raw ones (e.g. Date is re-formatted via format_datetime)
+    if not value:
+        return ""
+    try:
+        return str(email.policy.default.header_factory(name, str(value)))
+    except Exception:
+        return str(value)
+
+
 def compute_external_id(msg: email.message.Message) -> str:
-    mid = msg.get("Message-ID") or msg.get("Message-Id") or ""
+    # header lookups are case-insensitive, so one get covers Message-Id as well
+    mid = msg.get("Message-ID") or ""
     if mid:
         return mid.strip()
-    # Fallback hash
-    base = (msg.get("From", "") + msg.get("Date", "") + msg.get("Subject", "")).encode("utf-8", "ignore")
-    return hashlib.sha1(base).hexdigest()
+    # Fallback hash over the policy.default renderings, so fast_mail_parser and stdlib messages agree
+    base = "".join(_policy_header(name, msg.get(name, "")) for name in ("From", "Date", "Subject"))
+    return hashlib.sha1(base.encode("utf-8", "ignore")).hexdigest()
 
 
-def parse_eml_stream(root: str) -> Iterable[Tuple[email.message.Message, str]]:
-    for dirpath, _, filenames in os.walk(root):
-        for fn in filenames:
-            if not fn.lower().endswith((".eml", ".txt")):
-                continue
-            path = os.path.join(dirpath, fn)
-            try:
-                with open(path, "rb") as f:
-                    msg = email.message_from_binary_file(f, policy=email.policy.default)
-                yield msg, path
-            except Exception:
-                continue
+def _id_digest(external_id: str) -> bytes:
+    # 16-byte in-memory dedup key; persisted external ids stay SHA-1/Message-ID for stability
+    return hashlib.blake2b(external_id.encode("utf-8", "surrogatepass"), digest_size=16).digest()
 
 
-def parse_mbox_stream(root: str) -> Iterable[Tuple[email.message.Message, str]]:
-    for dirpath, _, filenames in os.walk(root):
-        for fn in filenames:
-            if not fn.lower().endswith((".mbox",)):
-                continue
-            path = os.path.join(dirpath, fn)
-            try:
-                mbox = mailbox.mbox(path)
-                for i, msg in enumerate(mbox):
-                    yield msg, f"{path}::msg:{i}"
-            except Exception:
-                continue
+_KIND_BY_EXT = {"eml": "eml", "txt": "eml", "mbox": "mbox", "emlx": "emlx", "ics": "ics"}
 
 
-def parse_emlx_stream(root: str) -> Iterable[Tuple[email.message.Message, str]]:
+def classify_files(root: str) -> Dict[str, List[str]]:
+    """Walk `root` once and group candidate files by parser kind: eml (incl. .txt), mbox, emlx, ics."""
+    groups: Dict[str, List[str]] = {"eml": [], "mbox": [], "emlx": [], "ics": []}
     for dirpath, _, filenames in os.walk(root):
         for fn in filenames:
-            if not fn.lower().endswith((".emlx",)):
-                continue
-            path = os.path.join(dirpath, fn)
-            try:
-                with open(path, "rb") as f:
-                    raw = f.read()
-                try:
-                    msg = email.message_from_bytes(raw, policy=email.policy.default)
-                except Exception:
-                    # Some emlx have a length prefix before the RFC822 payload
-                    msg = email.message_from_bytes(raw.split(b"\n", 1)[-1], policy=email.policy.default)
-                yield msg, path
-            except Exception:
-                continue
+            ext = fn.rpartition(".")[2]
+            # only the (short) extension is case-folded
+            kind = _KIND_BY_EXT.get(ext.lower()) if len(ext) < len(fn) else None
+            if kind:
+                groups[kind].append(os.path.join(dirpath, fn))
+    return groups
+
+
+def _read_eml(path: str) -> Iterable[Tuple[email.message.Message, str]]:
+    with open(path, "rb") as f:
+        yield parse_bytes(f.read()), path
+
+
+_MBOX_FROM_RE = re.compile(rb"(?m)^From ")
+
+
+def _mbox_offsets(path: str, mm) -> array:
+    # Start offset of every "From " separator plus EOF, cached in `path + '.idx'` while the mbox is unchanged
+    idx_path = path + ".idx"
+    size = len(mm)
+    try:
+        if os.path.getmtime(path) <= os.path.getmtime(idx_path):
+            offs = array("q")
+            with open(idx_path, "rb") as f:
+                offs.frombytes(f.read())
+            if offs and offs[-1] == size:
+                return offs
+    except OSError:
+        pass
+    offs = array("q", (m.start() for m in _MBOX_FROM_RE.finditer(mm)))
+    offs.append(size)
+    try:
+        with open(idx_path, "wb") as f:
+            offs.tofile(f)
+    except OSError:
+        pass
+    return offs
+
+
+def _read_mbox(path: str) -> Iterable[Tuple[email.message.Message, str]]:
+    # Same "From " line split as mailbox.mbox, but spans come from an mmap scan and go straight to parse_bytes
+    if not os.path.getsize(path):
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        offs = _mbox_offsets(path, mm)
+        for i in range(len(offs) - 1):
+            start, end = offs[i], offs[i + 1]
+            # drop the From_ envelope line, as mailbox does
+            nl = mm.find(b"\n", start, end)
+            body = mm[nl + 1:end] if nl != -1 else b""
+            yield parse_bytes(body), f"{path}::msg:{i}"
+
+
+def _read_emlx(path: str) -> Iterable[Tuple[email.message.Message, str]]:
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        msg = parse_bytes(raw)
+    except Exception:
+        # Some emlx have a length prefix before the RFC822 payload
+        msg = parse_bytes(raw.split(b"\n", 1)[-1])
+    yield msg, path
+
+
+_READERS = {"eml": _read_eml, "mbox": _read_mbox, "emlx": _read_emlx}
+
+
+def _stream(paths: List[str], kind: str) -> Iterable[Tuple[email.message.Message, str]]:
+    for path in paths:
+        try:
+            yield from _READERS[kind](path)
+        except Exception:
+            continue
+
+
+# Each parse_*_stream walks `root` itself unless the caller passes the pre-classified `paths`.
+def parse_eml_stream(root: str, paths: Optional[List[str]] = None) -> Iterable[Tuple[email.message.Message, str]]:
+    return _stream(classify_files(root)["eml"] if paths is None else paths, "eml")
+
+
+def parse_mbox_stream(root: str, paths: Optional[List[str]] = None) -> Iterable[Tuple[email.message.Message, str]]:
+    return _stream(classify_files(root)["mbox"] if paths is None else paths, "mbox")
+
+
+def parse_emlx_stream(root: str, paths: Optional[List[str]] = None) -> Iterable[Tuple[email.message.Message, str]]:
+    return _stream(classify_files(root)["emlx"] if paths is None else paths, "emlx")
 
 
 def unzip_archive(zip_path: str, out_dir: str) -> str:
@@ -113,44 +237,44 @@ def is_zip_archive(path: str) -> bool:
         return False
 
 
-def parse_ics_stream(root: str) -> Iterable[Tuple[dict, str]]:
+# RFC 5545 folding: CRLF (or bare LF) followed by one space/tab continues the previous line
+_ICS_UNFOLD_RE = re.compile(r"\r?\n[ \t]")
+
+
+def parse_ics_stream(root: str, paths: Optional[List[str]] = None) -> Iterable[Tuple[dict, str]]:
     # Minimal ICS parser (VEVENT only) using line scanning, tolerant of folded lines
-    for dirpath, _, filenames in os.walk(root):
-        for fn in filenames:
-            if not fn.lower().endswith((".ics",)):
-                continue
-            path = os.path.join(dirpath, fn)
-            try:
-                with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                    content = f.read()
-                lines = []
-                # Unfold folded lines (RFC 5545): lines starting with space or tab continue previous
-                for raw in content.splitlines():
-                    if raw.startswith(" ") or raw.startswith("\t"):
-                        if lines:
-                            lines[-1] += raw.strip()
-                    else:
-                        lines.append(raw)
-                events = []
-                cur = None
-                for ln in lines:
-                    if ln.strip() == "BEGIN:VEVENT":
-                        cur = {}
-                    elif ln.strip() == "END:VEVENT":
-                        if cur is not None:
-                            events.append(cur)
-                            cur = None
-                    elif cur is not None and ":" in ln:
-                        k, v = ln.split(":", 1)
-                        k = k.split(";", 1)[0].upper()
-                        cur[k] = v
-                for ev in events:
-                    yield ev, path
-            except Exception:
-                continue
+    for path in (classify_files(root)["ics"] if paths is None else paths):
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                content = f.read()
+            lines = _ICS_UNFOLD_RE.sub("", content).splitlines()
+            events = []
+            cur = None
+            for ln in lines:
+                marker = ln.strip()
+                if marker == "BEGIN:VEVENT":
+                    cur = {}
+                elif marker == "END:VEVENT":
+                    if cur is not None:
+                        events.append(cur)
+                        cur = None
+                elif cur is not None and ":" in ln:
+                    k, v = ln.split(":", 1)
+                    k = k.split(";", 1)[0].upper()
+                    cur[k] = v
+            for ev in events:
+                yield ev, path
+        except Exception:
+            continue
 
 
 def extract_body(msg: email.message.Message) -> Tuple[str, bool]:
+    text_plain = getattr(msg, "text_plain", None)
+    if text_plain is not None:
+        # ParsedMsg already holds decoded parts; mirror the stdlib branches below
+        if msg.is_multipart():
+            return ("\n\n".join(text_plain), True)
+        return ("\n\n".join(text_plain or msg.text_html), False)
     if msg.is_multipart():
         parts = []
         for part in msg.walk():
@@ -229,60 +353,155 @@ def preflight_source(path: str) -> None:
             pass
 
 
-def tag_from_config(cfg: Dict[str, Any], sender_email: str, recipients: List[str], subject: str, body: str) -> Tuple[Optional[str], List[str], List[Tuple[str, str]]]:
+try:
+    import ahocorasick  # type: ignore
+except ImportError:
+    ahocorasick = None
+
+# id(cfg) -> (cfg, compiled); holding cfg keeps its id from being reused
+_CFG_CACHE: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+
+
+def _compile_cfg(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Precompute the per-account matcher state used by `tag_from_config`.
+
+    - Lowercased aliases/keywords, `(name, lowered)` partners, and `'@domain'` needles per account.
+    - Subject override patterns compiled once.
+    - With pyahocorasick installed, one automaton over every term whose values are
+      `(account_index, role, partner_index)` hits, so a single pass scans the lowercased text.
+    - Otherwise one IGNORECASE alternation per account role/partner, searched against the
+      original text so no lowercased copy of the body is made.
+    """
+    cached = _CFG_CACHE.get(id(cfg))
+    if cached is not None and cached[0] is cfg:
+        return cached[1]
+
     overrides = cfg.get("overrides", {})
-    addresses = overrides.get("addresses", {})
-    subject_patterns = overrides.get("subject_patterns", [])
+    subject_patterns = []
+    for sp in overrides.get("subject_patterns", []):
+        pat = sp.get("pattern")
+        acc = sp.get("account")
+        if pat and acc:
+            subject_patterns.append((re.compile(pat), acc))
+
+    accounts = []
+    for acc in cfg.get("accounts", []):
+        accounts.append({
+            "name": acc.get("name"),
+            "aliases": [a.lower() for a in acc.get("aliases", []) if a],
+            "keywords": [k.lower() for k in acc.get("keywords", []) if k],
+            "at_domains": tuple("@" + d.lower() for d in acc.get("domains", [])),
+            "partners": [(p, p.lower()) for p in acc.get("partners", []) if p],
+        })
+
+    automaton = None
+    if ahocorasick is not None:
+        terms: Dict[str, List[Tuple[int, str, int]]] = {}
+        for i, acc in enumerate(accounts):
+            for a in acc["aliases"]:
+                terms.setdefault(a, []).append((i, "alias", -1))
+            for k in acc["keywords"]:
+                terms.setdefault(k, []).append((i, "keyword", -1))
+            for j, (_p, pl) in enumerate(acc["partners"]):
+                terms.setdefault(pl, []).append((i, "partner", j))
+        if terms:
+            automaton = ahocorasick.Automaton()
+            for term, hits in terms.items():
+                automaton.add_word(term, hits)
+            automaton.make_automaton()
+    else:
+        for acc in accounts:
+            acc["alias_re"] = _any_term_re(acc["aliases"])
+            acc["keyword_re"] = _any_term_re(acc["keywords"])
+            acc["partner_res"] = [_any_term_re([pl]) for _p, pl in acc["partners"]]
+
+    compiled = {
+        "addresses": overrides.get("addresses", {}),
+        "subject_patterns": subject_patterns,
+        "accounts": accounts,
+        "automaton": automaton,
+    }
+    _CFG_CACHE[id(cfg)] = (cfg, compiled)
+    return compiled
+
+
+def _any_term_re(terms: List[str]):
+    # Substring-existence test for any of `terms`, case-insensitively
+    if not terms:
+        return None
+    return re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE)
+
+
+def _term_hits(compiled: Dict[str, Any], text: str) -> set:
+    hits: set = set()
+    automaton = compiled["automaton"]
+    if automaton is not None:
+        # automaton keys are lowercase, so it scans a lowercased copy
+        for _end, term_hits in automaton.iter(text.lower()):
+            hits.update(term_hits)
+        return hits
+    for i, acc in enumerate(compiled["accounts"]):
+        if acc["alias_re"] is not None and acc["alias_re"].search(text):
+            hits.add((i, "alias", -1))
+        if acc["keyword_re"] is not None and acc["keyword_re"].search(text):
+            hits.add((i, "keyword", -1))
+        for j, pat in enumerate(acc["partner_res"]):
+            if pat.search(text):
+                hits.add((i, "partner", j))
+    return hits
+
+
+def tag_from_config(cfg: Dict[str, Any], sender_email: str, recipients: List[str], subject: str, body: str) -> Tuple[Optional[str], List[str], List[Tuple[str, str]]]:
+    compiled = _compile_cfg(cfg)
+    addresses = compiled["addresses"]
     if sender_email in addresses:
         t = addresses[sender_email]
         return t, [], [(t, "account")]
 
-    for sp in subject_patterns:
-        pat = sp.get("pattern")
-        acc = sp.get("account")
-        if pat and acc and re.search(pat, subject or ""):
+    for pat, acc in compiled["subject_patterns"]:
+        if pat.search(subject or ""):
             return acc, [], [(acc, "account")]
 
-    accounts = cfg.get("accounts", [])
     primary = None
     partners: List[str] = []
     tags: List[Tuple[str, str]] = []
-    text = f"{subject}\n{body}".lower()
-    recips_lower = [r.lower() for r in recipients]
-
-    for acc in accounts:
-        name = acc.get("name")
-        aliases = [a.lower() for a in acc.get("aliases", [])]
-        domains = [d.lower() for d in acc.get("domains", [])]
-        keywords = [k.lower() for k in acc.get("keywords", [])]
-        partners_cfg = acc.get("partners", [])
+    hits = _term_hits(compiled, f"{subject}\n{body}")
+    # '@domain' substring match, as before: acme.com also claims acme.com.au and acme.company.com.
+    # Newline-joined so one `in` scans every address and no needle can span two of them.
+    addresses_lower = "\n".join(a.lower() for a in [sender_email, *recipients] if a)
 
+    for i, acc in enumerate(compiled["accounts"]):
+        name = acc["name"]
         score = 0
-        if any(a in text for a in aliases):
+        if (i, "alias", -1) in hits:
             score += 1
-        if any(k in text for k in keywords):
+        if (i, "keyword", -1) in hits:
             score += 1
-        if any(('@' + d) in sender_email.lower() for d in domains) or any(('@' + d) in r for d in domains for r in recips_lower):
+        if any(d in addresses_lower for d in acc["at_domains"]):
             score += 2
         if score >= 2 and not primary:
             primary = name
             tags.append((name, "account"))
-        for p in partners_cfg:
-            if p.lower() in text:
+        for j, (p, _pl) in enumerate(acc["partners"]):
+            if (i, "partner", j) in hits:
                 partners.append(p)
                 tags.append((p, "partner"))
 
     return primary, partners, tags
 
 
-def iter_pypff_messages(pst_path: str) -> Iterable[Tuple[Dict[str, Any], List[Tuple[str, bytes]]]]:
+def iter_pypff_messages(pst_path: str) -> Iterable[Tuple[Dict[str, Any], List[Tuple[str, int]]]]:
     import pypff
 
     def walk(folder):
-        for i in range(folder.number_of_sub_messages):
-            yield folder.get_sub_message(i)
-        for j in range(folder.number_of_sub_folders):
-            yield from walk(folder.get_sub_folder(j))
+        # Iterative pre-order DFS (same order as the recursive walk); only unvisited folders stay referenced
+        stack = [folder]
+        while stack:
+            f = stack.pop()
+            for i in range(f.number_of_sub_messages):
+                yield f.get_sub_message(i)
+            stack.extend(f.get_sub_folder(j) for j in reversed(range(f.number_of_sub_folders)))
+            del f
 
     pf = pypff.file()
     pf.open(pst_path)
@@ -291,210 +510,287 @@ def iter_pypff_messages(pst_path: str) -> Iterable[Tuple[Dict[str, Any], List[Tu
     for item in walk(root):
         try:
             headers = item.get_transport_headers() or ""
-            raw = (headers + "\n\n" + (item.plain_text_body or "")).encode("utf-8", "ignore")
-            msg = email.message_from_bytes(raw, policy=email.policy.default)
-            # Attachments
-            atts: List[Tuple[str, bytes]] = []
+            body = item.plain_text_body or ""
+            raw = (headers + "\n\n" + body).encode("utf-8", "ignore")
+            msg = parse_bytes(raw)
+            # Attachments (names/sizes only; content is never stored, so don't read it into memory)
+            atts: List[Tuple[str, int]] = []
             for a in range(item.number_of_attachments):
                 att = item.get_attachment(a)
                 try:
-                    atts.append((att.get_filename() or "attachment", att.read_buffer(att.get_size())))
+                    atts.append((att.get_filename() or "attachment", int(att.get_size() or 0)))
                 except Exception:
                     continue
-            yield {"msg": msg, "folder": item.get_parent_folder().name if item.get_parent_folder() else None}, atts
+            # pypff already decoded the plain-text body; carry it so ingest can skip extract_body
+            parent = item.get_parent_folder()
+            yield {"msg": msg, "body": body, "folder": parent.name if parent else None}, atts
         except Exception:
             continue
+        finally:
+            # drop the pypff item/folder handles now instead of when the next item rebinds them
+            item = parent = att = None
+
+
+def build_record(cfg, msg: email.message.Message, folder: Optional[str], body: Optional[str] = None, external_id: Optional[str] = None, entities: bool = True) -> Tuple[Dict[str, Any], List[Dict], List[Tuple[str, str]]]:
+    """Parse a message into `(rec, ents, tags)` without touching the DB (safe to run in worker processes).
+
+    `entities=False` leaves `ents` empty so the caller can batch extraction with `extract_entities_batch`.
+    """
+    if body is None:
+        body, _ = extract_body(msg)
+    body = body or ""
+    # Each header is looked up once; every msg.get is a case-insensitive scan of the header list
+    get = msg.get
+    from_hdr = get("From")
+    sender = (parse_addrs(from_hdr) or [""])[0]
+    to_list = _addr_list(msg, "To")
+    cc_list = _addr_list(msg, "Cc")
+    bcc_list = _addr_list(msg, "Bcc")
+    recipients = to_list + cc_list + bcc_list
+
+    subject = safe_decode(get("Subject", ""))
+    sent = iso(parse_date(get("Date")))
+    if external_id is None:
+        external_id = compute_external_id(msg)
 
-
-def process_message(conn, cfg, msg: email.message.Message, folder: Optional[str]):
-    body, _ = extract_body(msg)
-    sender = email.utils.parseaddr(msg.get("From", ""))[1]
-    tos = ";".join([email.utils.parseaddr(x)[1] for x in msg.get_all("To", [])])
-    ccs = ";".join([email.utils.parseaddr(x)[1] for x in msg.get_all("Cc", [])])
-    bccs = ";".join([email.utils.parseaddr(x)[1] for x in msg.get_all("Bcc", [])])
-    recipients = []
-    if tos:
-        recipients.extend(tos.split(";"))
-    if ccs:
-        recipients.extend(ccs.split(";"))
-    if bccs:
-        recipients.extend(bccs.split(";"))
-
-    subject = safe_decode(msg.get("Subject", ""))
-    date_hdr = msg.get("Date")
-    sent = iso(parsedate_to_datetime(date_hdr)) if date_hdr else None
-    recvd = sent
-    external_id = compute_external_id(msg)
-
-    account_tag, partner_tags, tags = tag_from_config(cfg, sender, recipients, subject or "", body or "")
+    account_tag, partner_tags, tags = tag_from_config(cfg, sender, recipients, subject, body)
 
     rec = {
         "external_id": external_id,
-        "thread_id": msg.get("Thread-Index") or msg.get("Thread-Topic"),
+        "thread_id": get("Thread-Index") or get("Thread-Topic"),
         "folder": folder,
-        "sender_name": safe_decode(msg.get("From")),
+        "sender_name": safe_decode(from_hdr),
         "sender_email": sender,
-        "recipients_to": tos,
-        "recipients_cc": ccs,
-        "recipients_bcc": bccs,
+        "recipients_to": ";".join(to_list),
+        "recipients_cc": ";".join(cc_list),
+        "recipients_bcc": ";".join(bcc_list),
         "subject": subject,
         "body": body,
         "sent_at": sent,
-        "received_at": recvd,
+        "received_at": sent,
         "is_read": 0,
         "has_attachments": 0,
         "account_tag": account_tag,
         "partner_tags": ";".join(partner_tags) if partner_tags else None,
         "raw_headers": None,
     }
-    mid = upsert_message(conn, rec)
+    ents = extract_entities(body, mode=cfg.get("nlp_mode", "auto")) if entities and body else []
+    return rec, ents, tags
+
 
-    ents = extract_entities(body or "")
+def write_record(conn, rec: Dict[str, Any], ents: List[Dict], tags: List[Tuple[str, str]]) -> int:
+    mid = upsert_message(conn, rec)
     if ents:
         add_entities(conn, mid, ents)
-
     if tags:
         tag_message(conn, mid, tags)
-
     return mid
 
 
-def ingest_with_readpst(pst_path: str, conn, cfg: Dict[str, Any], checkpoint: str) -> None:
-    out_dir = os.path.join("data", "readpst_out")
-    run_readpst(pst_path, out_dir)
-    state = _load_state(checkpoint)
-    done = state.get("processed", {})
-    embedder = _maybe_embedder(cfg)
-    count = 0
-    for msg, path in parse_eml_stream(out_dir):
-        if done.get(path):
-            continue
-        mid = process_message(conn, cfg, msg, folder=None)
-        if embedder:
-            try:
-                embedder.add(mid, msg.get("Subject", ""), extract_body(msg)[0])
-            except Exception:
-                pass
-        _save_progress(checkpoint, path, mid)
-        count += 1
-        if count % 500 == 0:
-            print(f"Processed {count} messages...")
-    if embedder:
-        embedder.flush()
-    # Finalize
+def process_message(conn, cfg, msg: email.message.Message, folder: Optional[str], body: Optional[str] = None, external_id: Optional[str] = None) -> Tuple[int, str]:
+    rec, ents, tags = build_record(cfg, msg, folder, body, external_id)
+    return write_record(conn, rec, ents, tags), rec["body"]
+
+
+_WORKER_CFG: Optional[Dict[str, Any]] = None
+
+
+def _init_worker(cfg: Dict[str, Any]) -> None:
+    global _WORKER_CFG
+    _WORKER_CFG = cfg
+
+
+def _parse_file(job: Tuple[str, str, Any]) -> List[Tuple[str, Dict[str, Any], List[Dict], List[Tuple[str, str]]]]:
+    # Worker side: file -> plain records (picklable); failures skip the file like the stream parsers.
+    # `skip` holds already-ingested mbox member keys, so a resume doesn't re-tag or re-run NER on them.
+    kind, path, skip = job
+    out = []
     try:
-        conn.commit()
+        for msg, key in _READERS[kind](path):
+            if key in skip:
+                continue
+            out.append((key,) + build_record(_WORKER_CFG, msg, None, entities=False))
     except Exception:
         pass
-    # ICS files -> events
-    created = 0
-    for ev, path in parse_ics_stream(root_dir):
-        if done.get(path):
-            continue
-        title = ev.get("SUMMARY")
-        loc = ev.get("LOCATION")
-        starts_at = None
-        ends_at = None
-        try:
-            if ev.get("DTSTART"):
-                starts_at = iso(dateparse.parse(ev.get("DTSTART")))
-            if ev.get("DTEND"):
-                ends_at = iso(dateparse.parse(ev.get("DTEND")))
-        except Exception:
-            pass
-        insert_event(conn, None, "calendar", title, starts_at, ends_at, loc, None)
-        _save_progress(checkpoint, path, -1)
-        created += 1
-        if created % 1000 == 0:
-            print(f"Parsed {created} ICS events...")
-    if created:
-        print(f"Created {created} events from ICS files.")
+    # One spaCy pipe per file (an mbox can hold thousands of messages)
+    batch = extract_entities_batch([rec["body"] or "" for _key, rec, _ents, _tags in out], mode=_WORKER_CFG.get("nlp_mode", "auto"))
+    return [(key, rec, ents, tags) for (key, rec, _e, tags), ents in zip(out, batch)]
 
 
-def ingest_from_eml_dir(root_dir: str, conn, cfg: Dict[str, Any], checkpoint: str) -> None:
-    state = _load_state(checkpoint)
-    done = state.get("processed", {})
-    embedder = _maybe_embedder(cfg)
+_COMMIT_EVERY = 1000
+
+
+def _commit_batch(conn, progress) -> None:
+    # Commit rows before syncing the progress log, so a logged item always has its rows on disk.
+    # A failed commit (SQLITE_BUSY, disk full) propagates; the queued entries die with the run.
+    conn.commit()
+    progress.sync()
+
+
+def _ingest_stream(conn, cfg: Dict[str, Any], stream: Iterable[Tuple[email.message.Message, str]], done: Dict[str, Any], progress, embedder) -> int:
     count = 0
-    # EML files
-    for msg, path in parse_eml_stream(root_dir):
+    for msg, path in stream:
         if done.get(path):
             continue
-        mid = process_message(conn, cfg, msg, folder=None)
+        mid, body = process_message(conn, cfg, msg, folder=None)
         if embedder:
             try:
-                embedder.add(mid, msg.get("Subject", ""), extract_body(msg)[0])
+                embedder.add(mid, msg.get("Subject", ""), body)
             except Exception:
                 pass
-        _save_progress(checkpoint, path, mid)
+        progress.record("processed", path, mid)
         count += 1
+        if count % _COMMIT_EVERY == 0:
+            _commit_batch(conn, progress)
         if count % 500 == 0:
             print(f"Processed {count} messages...")
     if embedder:
-        embedder.flush()
-    try:
-        conn.commit()
-    except Exception:
-        pass
-    # MBOX files
-    for msg, path in parse_mbox_stream(root_dir):
-        if done.get(path):
-            continue
-        mid = process_message(conn, cfg, msg, folder=None)
-        if embedder:
-            try:
-                embedder.add(mid, msg.get("Subject", ""), extract_body(msg)[0])
-            except Exception:
-                pass
-        _save_progress(checkpoint, path, mid)
+        embedder.flush(persist=True)
+    _commit_batch(conn, progress)
+    return count
+
+
+def _done_mbox_members(done: Dict[str, Any]) -> Dict[str, frozenset]:
+    # "<mbox path>::msg:<i>" checkpoint keys grouped by mailbox path
+    members: Dict[str, set] = {}
+    for key in done:
+        path, sep, _i = key.rpartition("::msg:")
+        if sep:
+            members.setdefault(path, set()).add(key)
+    return {path: frozenset(keys) for path, keys in members.items()}
+
+
+def _ingest_files_parallel(conn, cfg: Dict[str, Any], files: List[Tuple[str, str]], jobs: int, done: Dict[str, Any], progress, embedder) -> int:
+    # Parsing, tagging and entity extraction fan out to worker processes; this process stays the only SQLite writer.
+    count = 0
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(cfg,)) as executor:
+        # Bounded so parsed files don't pile up in this process when the writer falls behind.
+        # A mailbox can hold thousands of messages, so mbox files go one per task.
+        results = (
+            parsed
+            for kind, run in groupby(files, key=lambda job: job[0])
+            for parsed in bounded_map(executor, _parse_file, list(run), jobs, chunksize=1 if kind == "mbox" else 32)
+        )
+        for parsed in results:
+            for key, rec, ents, tags in parsed:
+                if done.get(key):
+                    continue
+                mid = write_record(conn, rec, ents, tags)
+                if embedder:
+                    try:
+                        embedder.add(mid, rec["subject"], rec["body"])
+                    except Exception:
+                        pass
+                progress.record("processed", key, mid)
+                count += 1
+                if count % _COMMIT_EVERY == 0:
+                    _commit_batch(conn, progress)
+                if count % 500 == 0:
+                    print(f"Processed {count} messages...")
     if embedder:
-        embedder.flush()
-    try:
-        conn.commit()
-    except Exception:
-        pass
-    # EMLX files (Apple Mail)
-    for msg, path in parse_emlx_stream(root_dir):
-        if done.get(path):
-            continue
-        mid = process_message(conn, cfg, msg, folder=None)
-        if embedder:
+        embedder.flush(persist=True)
+    _commit_batch(conn, progress)
+    return count
+
+
+def ingest_with_readpst(pst_path: str, conn, cfg: Dict[str, Any], checkpoint: str, jobs: int = 1) -> None:
+    out_dir = os.path.join("data", "readpst_out")
+    run_readpst(pst_path, out_dir)
+    progress = _ProgressLog(checkpoint)
+    done = progress.state.setdefault("processed", {})
+    embedder = _maybe_embedder(cfg)
+    groups = classify_files(out_dir)
+    if jobs > 1:
+        files = [("eml", p, ()) for p in groups["eml"] if not done.get(p)]
+        _ingest_files_parallel(conn, cfg, files, jobs, done, progress, embedder)
+    else:
+        _ingest_stream(conn, cfg, parse_eml_stream(out_dir, groups["eml"]), done, progress, embedder)
+    # ICS files -> events
+    created = 0
+    ics_files = 0
+    ics_paths = [p for p in groups["ics"] if not done.get(p)]
+    for path, events in groupby(parse_ics_stream(out_dir, ics_paths), key=lambda item: item[1]):
+        for ev, _path in events:
+            title = ev.get("SUMMARY")
+            loc = ev.get("LOCATION")
+            starts_at = None
+            ends_at = None
             try:
-                embedder.add(mid, msg.get("Subject", ""), extract_body(msg)[0])
+                if ev.get("DTSTART"):
+                    starts_at = iso(dateparse.parse(ev.get("DTSTART")))
+                if ev.get("DTEND"):
+                    ends_at = iso(dateparse.parse(ev.get("DTEND")))
             except Exception:
                 pass
-        _save_progress(checkpoint, path, mid)
-    if embedder:
-        embedder.flush()
+            insert_event(conn, None, "calendar", title, starts_at, ends_at, loc, None)
+            created += 1
+        # checkpoint a file only once all of its VEVENTs are inserted, and commit on file boundaries
+        progress.record("processed", path, -1)
+        ics_files += 1
+        if ics_files % _COMMIT_EVERY == 0:
+            _commit_batch(conn, progress)
+            print(f"Parsed {created} ICS events...")
+    _commit_batch(conn, progress)
+    progress.close()
+    if created:
+        print(f"Created {created} events from ICS files.")
+
+
+def ingest_from_eml_dir(root_dir: str, conn, cfg: Dict[str, Any], checkpoint: str, jobs: int = 1) -> None:
+    progress = _ProgressLog(checkpoint)
+    done = progress.state.setdefault("processed", {})
+    embedder = _maybe_embedder(cfg)
+    # One directory walk feeds all three formats
+    groups = classify_files(root_dir)
+    if jobs > 1:
+        # Same EML -> MBOX -> EMLX order as the sequential path; done mbox members are skipped in the worker
+        files = [("eml", p, ()) for p in groups["eml"] if not done.get(p)]
+        mbox_done = _done_mbox_members(done)
+        files += [("mbox", p, mbox_done.get(p, frozenset())) for p in groups["mbox"]]
+        files += [("emlx", p, ()) for p in groups["emlx"] if not done.get(p)]
+        _ingest_files_parallel(conn, cfg, files, jobs, done, progress, embedder)
+        progress.close()
+        return
+    _ingest_stream(conn, cfg, parse_eml_stream(root_dir, groups["eml"]), done, progress, embedder)
+    _ingest_stream(conn, cfg, parse_mbox_stream(root_dir, groups["mbox"]), done, progress, embedder)
+    _ingest_stream(conn, cfg, parse_emlx_stream(root_dir, groups["emlx"]), done, progress, embedder)
+    progress.close()
 
 
 def ingest_with_pypff(pst_path: str, conn, cfg: Dict[str, Any], checkpoint: str) -> None:
-    state = _load_state(checkpoint)
-    seen_ids = set(state.get("external_ids", []))
+    progress = _ProgressLog(checkpoint)
+    # Digests are checkpointed base64-encoded; plain ids from older checkpoints are still honoured
+    seen_ids = {base64.b64decode(d) for d in progress.state.get("external_id_digests", [])}
+    seen_ids.update(_id_digest(x) for x in progress.state.get("external_ids", []))
     embedder = _maybe_embedder(cfg)
     count = 0
     for payload, atts in iter_pypff_messages(pst_path):
         msg = payload["msg"]
         folder = payload.get("folder")
         external_id = compute_external_id(msg)
-        if external_id in seen_ids:
+        digest = _id_digest(external_id)
+        if digest in seen_ids:
             continue
-        mid = process_message(conn, cfg, msg, folder)
+        mid, body = process_message(conn, cfg, msg, folder, body=payload.get("body"), external_id=external_id)
         # attachments
-        for fn, data in atts:
-            insert_attachment(conn, mid, fn, None, len(data) if data else 0, None)
+        for fn, size in atts:
+            insert_attachment(conn, mid, fn, None, size, None)
         if embedder:
             try:
-                embedder.add(mid, msg.get("Subject", ""), extract_body(msg)[0])
+                embedder.add(mid, msg.get("Subject", ""), body)
             except Exception:
                 pass
-        seen_ids.add(external_id)
-        _save_state(checkpoint, {"external_ids": list(seen_ids)})
+        seen_ids.add(digest)
+        progress.record("external_id_digests", base64.b64encode(digest).decode("ascii"))
         count += 1
+        if count % _COMMIT_EVERY == 0:
+            _commit_batch(conn, progress)
         if count % 500 == 0:
             print(f"Processed {count} messages...")
     if embedder:
-        embedder.flush()
+        embedder.flush(persist=True)
+    _commit_batch(conn, progress)
+    progress.close()
 
 
 def _load_state(path: str) -> Dict[str, Any]:
@@ -507,12 +803,6 @@ def _load_state(path: str) -> Dict[str, Any]:
         return {}
 
 
-def _save_progress(path: str, item_key: str, message_id: int) -> None:
-    st = _load_state(path)
-    st.setdefault("processed", {})[item_key] = message_id
-    _save_state(path, st)
-
-
 def _save_state(path: str, st: Dict[str, Any]) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
     tmp = path + ".tmp"
@@ -521,16 +811,78 @@ def _save_state(path: str, st: Dict[str, Any]) -> None:
     os.replace(tmp, path)
 
 
+class _ProgressLog:
+    """Append-only write-ahead log over the JSON checkpoint snapshot.
+
+    - Each `record` updates `state` and queues one JSON line `[section, key, value]` in memory.
+    - Queued lines reach `path + '.log'` only via `sync`, which callers run right after `conn.commit()`,
+      so an interrupted run never logs rows that were rolled back.
+    - On open the log is replayed into `state`; `close` (or the next open) compacts it into the snapshot.
+    - `value=None` appends `key` to a list section (e.g. `external_id_digests`); otherwise `state[section][key] = value`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.log_path = path + ".log"
+        self.state = _load_state(path)
+        self._pending: List[str] = []
+        if os.path.exists(self.log_path):
+            self._replay()
+            self.compact()
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        self._f = open(self.log_path, "a", encoding="utf-8")
+
+    def _apply(self, section: str, key: str, value: Any) -> None:
+        if value is None:
+            self.state.setdefault(section, []).append(key)
+        else:
+            self.state.setdefault(section, {})[key] = value
+
+    def _replay(self) -> None:
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    section, key, value = json.loads(line)
+                except Exception:
+                    # torn tail from a crash mid-write
+                    continue
+                self._apply(section, key, value)
+
+    def record(self, section: str, key: str, value: Any = None) -> None:
+        self._apply(section, key, value)
+        self._pending.append(json.dumps([section, key, value]) + "\n")
+
+    def sync(self) -> None:
+        if not self._pending or self._f.closed:
+            return
+        self._f.write("".join(self._pending))
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pending = []
+
+    def compact(self) -> None:
+        _save_state(self.path, self.state)
+        # snapshot now covers every logged record
+        open(self.log_path, "w").close()
+
+    def close(self) -> None:
+        self.sync()
+        self._f.close()
+        self.compact()
+
+
 def main():
     ap = argparse.ArgumentParser(description="Stream PST into SQLite with tagging and entities")
     ap.add_argument("--pst", required=True, help="Path to PST file")
     ap.add_argument("--db", required=True, help="Path to SQLite DB")
     ap.add_argument("--checkpoint", required=True, help="Path to checkpoint state JSON")
     ap.add_argument("--config", default="config/accounts.yml", help="Accounts config")
+    ap.add_argument("--jobs", type=int, default=None, help="Parser processes (default: inline for EML/MBOX/EMLX, one per CPU for Outlook Mac XML)")
     args = ap.parse_args()
 
     cfg = load_config_accounts(args.config)
     conn = connect(args.db)
+    tune_connection(conn)
     try:
         preflight_source(args.pst)
     except Exception as e:
@@ -550,7 +902,7 @@ def main():
         print("Detected Zip archive. Unzipping and parsing EML...")
         eml_root = unzip_archive(args.pst, os.path.join('data', 'eml_unzip'))
         # First, try EML/MBOX/EMLX
-        ingest_from_eml_dir(eml_root, conn, cfg, args.checkpoint)
+        ingest_from_eml_dir(eml_root, conn, cfg, args.checkpoint, jobs=args.jobs or 1)
         # If no messages were created, attempt Outlook Mac XML conversion
         try:
             cur = conn.execute("SELECT COUNT(*) FROM messages")
@@ -559,7 +911,7 @@ def main():
             n = 0
         if n == 0:
             print("No EML/MBOX found. Attempting Outlook Mac XML conversion...")
-            created = ingest_outlook_mac_dir(eml_root, conn, cfg, args.checkpoint)
+            created = ingest_outlook_mac_dir(eml_root, conn, cfg, args.checkpoint, jobs=args.jobs)
             print(f"Converted {created} messages from Outlook Mac XML.")
     elif use_pypff:
         print("Using pypff path.")
@@ -569,7 +921,7 @@ def main():
             print("readpst not found. Please install libpst (readpst) or provide a Zip of EML/mbox exports.", file=sys.stderr)
             sys.exit(2)
         print("Using readpst path (cross-platform).")
-        ingest_with_readpst(args.pst, conn, cfg, args.checkpoint)
+        ingest_with_readpst(args.pst, conn, cfg, args.checkpoint, jobs=args.jobs or 1)
 
     print("Ingest completed.")
 
@@ -582,7 +934,7 @@ def _maybe_embedder(cfg: Dict[str, Any]) -> Optional[EmbeddingIndexer]:
     index_path = sem.get("faiss_index", "data/semantic/faiss.index")
     os.makedirs(os.path.dirname(index_path), exist_ok=True)
     try:
-        return EmbeddingIndexer(model, index_path)
+        return EmbeddingIndexer(model, index_path, quantization=sem.get("quantization", "fp32"))
     except Exception as e:
         print(f"Semantic layer disabled due to error: {e}")
         return None
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import os
 import json
+import atexit
 from typing import List, Tuple, Optional
 
 
@@ -9,18 +10,50 @@ class EmbeddingIndexer:
     """Manages a local FAISS index for message embeddings.
 
     - Uses SentenceTransformers for 2k-char excerpts.
-    - Stores FAISS index at `index_path` and an ID mapping sidecar at `index_path + '.meta.jsonl'`.
-    - Adds in batches to limit memory while ingesting.
+    - Stores FAISS index at `index_path` and an audit sidecar (message id + excerpt) at `index_path + '.meta.jsonl'`.
+    - Buffers excerpts and encodes them in one batched model call per flush (500, or 2048 on CUDA).
+    - `mmap=True` maps an existing index read-only instead of loading it into RAM (search-only use).
+    - Indexes are HNSW wrapped in `IndexIDMap2`, so FAISS returns message ids directly;
+      legacy positional flat indexes are migrated on first writable load.
+    - Each flush appends to `.vecs.f32` / `.ids.i64`; the index file is rewritten every
+      `PERSIST_EVERY` flushes, on `flush(persist=True)` or at exit, and replays the log tail on load.
+      Persisting a trained index empties the log, so it only ever holds the unsaved tail.
+    - `quantization` picks the layout of a new index: `fp32` (HNSW, default), `sq8` (HNSW over
+      8-bit scalar-quantized vectors) or `pq16` (IVF-PQ, 16 bytes/vector). The quantized layouts
+      train once from the vector log, then add everything logged so far.
     """
 
-    def __init__(self, model_name: str, index_path: str):
+    HNSW_M = 32
+    EF_CONSTRUCTION = 80
+    EF_SEARCH = 64
+    PERSIST_EVERY = 20
+    QUANTIZATIONS = ("fp32", "sq8", "pq16")
+    SQ8_TRAIN = 10_000
+    PQ_TRAIN = 100_000
+    PQ_M = 16
+    PQ_NLIST = 4096
+    PQ_NPROBE = 32
+    PQ_MIN_TRAIN = 256  # k-means needs at least 2**nbits points per sub-quantizer
+
+    def __init__(self, model_name: str, index_path: str, mmap: bool = False, quantization: str = "fp32"):
+        if quantization not in self.QUANTIZATIONS:
+            raise ValueError(f"quantization must be one of {self.QUANTIZATIONS}, got {quantization!r}")
         self.model_name = model_name
         self.index_path = index_path
+        self.mmap = mmap
+        self.quantization = quantization
         self.meta_path = index_path + ".meta.jsonl"
+        self.vecs_path = index_path + ".vecs.f32"
+        self.ids_path = index_path + ".ids.i64"
         self._model = None
         self._index = None
         self._dim = None
-        self._buffer: List[Tuple[int, List[float], str]] = []  # (message_id, vector, excerpt)
+        self._buffer: List[Tuple[int, str]] = []  # (message_id, excerpt); encoded in one batch on flush
+        self._flush_at = 500
+        self._has_ids = False  # IndexIDMap2 (new) vs positional legacy IndexFlatIP
+        self._meta_ids: Optional[List[int]] = None
+        self._unsaved = 0  # flushes since the last write_index
+        self._atexit = False
 
     def _ensure_model(self):
         if self._model is None:
@@ -31,6 +64,13 @@ class EmbeddingIndexer:
                 raise RuntimeError(
                     f"Failed to load embeddings model '{self.model_name}'. Install/cache it locally. Error: {e}"
                 )
+            try:
+                import torch  # type: ignore
+                if torch.cuda.is_available():
+                    # GPU batches amortize far better; buffer more before each encode
+                    self._flush_at = 2048
+            except Exception:
+                pass
 
     def _ensure_index(self):
         if self._index is not None:
@@ -41,12 +81,114 @@ class EmbeddingIndexer:
             raise RuntimeError("FAISS not available. Install faiss-cpu. Error: %s" % e)
 
         if os.path.exists(self.index_path):
-            self._index = faiss.read_index(self.index_path)
+            flags = (faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY) if self.mmap else 0
+            self._index = faiss.read_index(self.index_path, flags)
             self._dim = self._index.d
+            self._has_ids = isinstance(self._index, faiss.IndexIDMap)
+            if not self._has_ids and not self.mmap:
+                self._migrate_legacy()
         else:
-            # Create an inner-product flat index (use normalized vectors for cosine similarity)
             self._dim = self.embed_dim()
-            self._index = faiss.IndexFlatIP(self._dim)
+            self._index = self._new_index()
+            self._has_ids = True
+        if self._has_ids and not self.mmap:
+            self._trim_log()
+            self._replay_log()
+
+    def _new_index(self, n_train: Optional[int] = None):
+        import faiss  # type: ignore
+        # Inner product over normalized vectors, i.e. cosine similarity
+        if self.quantization == "pq16":
+            if self._dim % self.PQ_M:
+                raise RuntimeError(f"pq16 needs an embedding dim divisible by {self.PQ_M}, got {self._dim}")
+            # ~39 training points per list keeps k-means sane on small corpora
+            nlist = self.PQ_NLIST if n_train is None else max(1, min(self.PQ_NLIST, n_train // 39))
+            ivf = faiss.IndexIVFPQ(faiss.IndexFlatIP(self._dim), self._dim, nlist, self.PQ_M, 8, faiss.METRIC_INNER_PRODUCT)
+            ivf.nprobe = min(self.PQ_NPROBE, nlist)
+            return faiss.IndexIDMap2(ivf)
+        if self.quantization == "sq8":
+            hnsw = faiss.IndexHNSWSQ(self._dim, faiss.ScalarQuantizer.QT_8bit, self.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        else:
+            hnsw = faiss.IndexHNSWFlat(self._dim, self.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = self.EF_CONSTRUCTION
+        hnsw.hnsw.efSearch = self.EF_SEARCH
+        return faiss.IndexIDMap2(hnsw)
+
+    def _train_target(self) -> int:
+        return self.PQ_TRAIN if self.quantization == "pq16" else self.SQ8_TRAIN
+
+    def _log_rows(self) -> int:
+        if not (os.path.exists(self.vecs_path) and os.path.exists(self.ids_path)):
+            return 0
+        return min(os.path.getsize(self.vecs_path) // (4 * self._dim), os.path.getsize(self.ids_path) // 8)
+
+    def _trim_log(self):
+        # A crash between the two appends leaves one file ahead (or a torn row); cut both back to the
+        # paired rows, otherwise the next flush would shift every later vector onto the wrong id.
+        n = self._log_rows()
+        for path, width in ((self.vecs_path, 4 * self._dim), (self.ids_path, 8)):
+            if os.path.exists(path) and os.path.getsize(path) > n * width:
+                with open(path, "r+b") as f:
+                    f.truncate(n * width)
+
+    def _read_log(self, start: int, stop: int):
+        import numpy as np  # type: ignore
+        vecs = np.fromfile(self.vecs_path, dtype=np.float32, count=(stop - start) * self._dim, offset=start * 4 * self._dim)
+        ids = np.fromfile(self.ids_path, dtype=np.int64, count=stop - start, offset=start * 8)
+        return vecs.reshape(-1, self._dim), ids
+
+    def _migrate_legacy(self):
+        # One-time rewrite of a positional flat index into IndexIDMap2, seeding the vector log
+        import numpy as np  # type: ignore
+        import faiss  # type: ignore
+        ids = np.asarray(self._load_meta_ids(), dtype="int64")
+        n = min(int(self._index.ntotal), len(ids))
+        vecs = np.ascontiguousarray(self._index.reconstruct_n(0, n), dtype="float32")
+        ids = ids[:n]
+        vecs.tofile(self.vecs_path)
+        ids.tofile(self.ids_path)
+        self._index = self._new_index()
+        self._has_ids = True
+        self._replay_log(force=True)
+        faiss.write_index(self._index, self.index_path)
+        self._unsaved = 0
+        if self._index.is_trained:
+            self._rotate_log()
+
+    def _held_prefix(self, n: int) -> int:
+        # Logged rows the loaded index already holds. The log is rotated on persist, so this is usually
+        # 0, but a crash right after write_index (or a log written before rotation) leaves a held prefix.
+        import numpy as np  # type: ignore
+        import faiss  # type: ignore
+        ids = np.fromfile(self.ids_path, dtype=np.int64, count=n)
+        held = np.isin(ids, faiss.vector_to_array(self._index.id_map))
+        return n if held.all() else int(np.argmin(held))
+
+    def _rotate_log(self):
+        # write_index just covered every logged row; truncating keeps disk use at the quantized size
+        for path in (self.vecs_path, self.ids_path):
+            if os.path.exists(path):
+                open(path, "wb").close()
+
+    def _replay_log(self, force: bool = False):
+        # Add log rows the index does not hold yet: the tail after the last write_index (crash or
+        # early exit), or everything staged while a quantized index waited for training data.
+        n = self._log_rows()
+        start = self._held_prefix(n) if self._index.ntotal else 0
+        if n <= start:
+            return
+        if not self._index.is_trained:
+            if n < self._train_target() and not force:
+                return
+            if self.quantization == "pq16" and n < self.PQ_MIN_TRAIN:
+                return
+            sample, _ids = self._read_log(0, min(n, self._train_target()))
+            if self.quantization == "pq16":
+                self._index = self._new_index(n_train=len(sample))
+            self._index.train(sample)
+        vecs, ids = self._read_log(start, n)
+        self._index.add_with_ids(vecs, ids)
+        self._unsaved += 1
 
     def embed_dim(self) -> int:
         self._ensure_model()
@@ -57,51 +199,98 @@ class EmbeddingIndexer:
         self._dim = int(vec.shape[1])
         return self._dim
 
+    @staticmethod
+    def _excerpt(subject: str, body: str) -> str:
+        text = (subject or "").strip() + "\n\n" + (body or "").strip()
+        return text[:2000]
+
     def encode_excerpt(self, subject: str, body: str) -> Tuple[List[float], str]:
         self._ensure_model()
-        text = (subject or "").strip() + "\n\n" + (body or "").strip()
-        excerpt = text[:2000]
+        excerpt = self._excerpt(subject, body)
         vec = self._model.encode([excerpt], normalize_embeddings=True)
         return vec[0].tolist(), excerpt
 
     def add(self, message_id: int, subject: str, body: str):
-        try:
-            vec, excerpt = self.encode_excerpt(subject, body)
-        except Exception as e:
-            # Model not available or failed; skip silently but could log
-            return
-        self._buffer.append((message_id, vec, excerpt))
-        if len(self._buffer) >= 500:
+        self._buffer.append((message_id, self._excerpt(subject, body)))
+        if len(self._buffer) >= self._flush_at:
             self.flush()
 
-    def flush(self):
+    def flush(self, persist: bool = False):
         if not self._buffer:
+            if persist:
+                # the last add() may have flushed exactly at flush_at, leaving staged rows untrained
+                if self._index is not None and self._has_ids and not self._index.is_trained:
+                    self._replay_log(force=True)
+                self._persist()
+            return
+        try:
+            self._ensure_model()
+            self._ensure_index()
+            mat = self._model.encode(
+                [ex for (_mid, ex) in self._buffer],
+                batch_size=64,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+        except Exception:
+            # Model/index not available or failed; drop the batch silently as add() used to
+            self._buffer.clear()
             return
-        self._ensure_index()
         import numpy as np  # type: ignore
-        import faiss  # type: ignore
 
-        ids = [mid for (mid, _v, _ex) in self._buffer]
-        mat = np.array([v for (_mid, v, _ex) in self._buffer], dtype="float32")
-        self._index.add(mat)
-        # append meta mapping lines
+        # encode() already yields a C-contiguous float32 (N, dim) array; this is a no-op view then
+        mat = np.ascontiguousarray(mat, dtype=np.float32)
         os.makedirs(os.path.dirname(self.meta_path) or ".", exist_ok=True)
+        # writable loads migrate legacy positional indexes, so the index here is always ID-mapped
+        ids = np.fromiter((mid for (mid, _ex) in self._buffer), dtype="int64", count=len(self._buffer))
+        # append-only vector log first, so a crash before write_index can be replayed
+        with open(self.vecs_path, "ab") as f:
+            mat.tofile(f)
+        with open(self.ids_path, "ab") as f:
+            ids.tofile(f)
+        if self._index.is_trained:
+            self._index.add_with_ids(mat, ids)
+        else:
+            # quantized index still staging training vectors in the log
+            self._replay_log(force=persist)
+        # append meta mapping lines
         with open(self.meta_path, "a", encoding="utf-8") as f:
-            for mid, _v, ex in self._buffer:
+            for mid, ex in self._buffer:
                 f.write(json.dumps({"message_id": mid, "excerpt": ex}) + "\n")
-        # persist index
+        self._buffer.clear()
+        self._unsaved += 1
+        if not self._atexit:
+            atexit.register(self._persist)
+            self._atexit = True
+        if persist or self._unsaved >= self.PERSIST_EVERY:
+            self._persist()
+
+    def _persist(self):
+        if self._index is None or not self._unsaved or self.mmap:
+            return
+        import faiss  # type: ignore
         os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
         faiss.write_index(self._index, self.index_path)
-        self._buffer.clear()
+        self._unsaved = 0
+        # an untrained quantized index still needs the staged rows to train on
+        if self._index.is_trained:
+            self._rotate_log()
 
     def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
         self._ensure_index()
         self._ensure_model()
         import numpy as np  # type: ignore
-        q = self._model.encode([query], normalize_embeddings=True)
-        D, I = self._index.search(np.array(q, dtype="float32"), k)
-        # Map FAISS local ids to message_ids using meta file order
-        msg_ids = self._load_meta_ids()
+        if not self._index.is_trained:
+            return []
+        q = self._model.encode([query], normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False)
+        D, I = self._index.search(np.ascontiguousarray(q, dtype=np.float32), k)
+        if self._has_ids:
+            return [(int(idx), float(score)) for idx, score in zip(I[0], D[0]) if idx != -1]
+        # Legacy index opened read-only: map FAISS local ids via meta file order, parsed once
+        if self._meta_ids is None:
+            self._meta_ids = self._load_meta_ids()
+        msg_ids = self._meta_ids
         results: List[Tuple[int, float]] = []
         for idx, score in zip(I[0], D[0]):
             if idx == -1:
@@ -1,40 +1,97 @@
 import re
+import threading
 from typing import List, Dict
 
-_RE_EMAIL = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
-_RE_DATE = re.compile(r"\b(\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{2,4})\b")
-_RE_MONEY = re.compile(r"\$\s?\d{1,3}(,\d{3})*(\.\d{2})?\b")
+try:
+    # RE2 guarantees linear-time scans on multi-MB bodies; same finditer API as `re` for these patterns.
+    import re2 as _ent_re  # type: ignore
+except ImportError:
+    _ent_re = re
 
+_RE_EMAIL = _ent_re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+_RE_DATE = _ent_re.compile(r"\b(\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{2,4})\b")
+_RE_MONEY = _ent_re.compile(r"\$\s?\d{1,3}(,\d{3})*(\.\d{2})?\b")
 
-def extract_entities(text: str) -> List[Dict]:
-    ents: List[Dict] = []
-    if not text:
-        return ents
+# "auto" mode only pays for spaCy on longer texts with a capitalized multi-word run (likely names/orgs).
+_CAPS_RE = _ent_re.compile(r"\b[A-Z][a-z]+\s+[A-Z][a-z]+")
+_AUTO_MIN_LEN = 200
 
-    try:
-        import spacy  # type: ignore
-        try:
-            nlp = spacy.load("en_core_web_sm")
-        except Exception:
-            nlp = None
-        if nlp is not None:
-            doc = nlp(text)
-            for e in doc.ents:
-                ents.append({
-                    "label": e.label_,
-                    "text": e.text,
-                    "start_char": int(e.start_char),
-                    "end_char": int(e.end_char),
-                })
-    except Exception:
-        pass
+# Only `ner` is used; the rest of the pipeline is dead weight per document.
+_SPACY_DISABLE = ["tagger", "parser", "lemmatizer", "attribute_ruler", "tok2vec"]
 
-    # Fallback regexes
+_NLP = None  # None = not tried yet, False = spaCy/model unavailable
+_NLP_LOCK = threading.Lock()
+
+
+def _get_nlp():
+    global _NLP
+    if _NLP is None:
+        with _NLP_LOCK:
+            if _NLP is None:
+                try:
+                    import spacy  # type: ignore
+                    _NLP = spacy.load("en_core_web_sm", disable=_SPACY_DISABLE)
+                except Exception:
+                    _NLP = False
+    return _NLP or None
+
+
+def _doc_entities(doc) -> List[Dict]:
+    return [
+        {"label": e.label_, "text": e.text, "start_char": int(e.start_char), "end_char": int(e.end_char)}
+        for e in doc.ents
+    ]
+
+
+def _regex_entities(text: str) -> List[Dict]:
+    ents: List[Dict] = []
     for m in _RE_EMAIL.finditer(text):
         ents.append({"label": "EMAIL", "text": m.group(0), "start_char": m.start(), "end_char": m.end()})
     for m in _RE_DATE.finditer(text):
         ents.append({"label": "DATE", "text": m.group(0), "start_char": m.start(), "end_char": m.end()})
     for m in _RE_MONEY.finditer(text):
         ents.append({"label": "MONEY", "text": m.group(0), "start_char": m.start(), "end_char": m.end()})
+    return ents
+
 
+def _wants_spacy(text: str, mode: str) -> bool:
+    if mode == "regex":
+        return False
+    if mode == "auto":
+        return len(text) >= _AUTO_MIN_LEN and _CAPS_RE.search(text) is not None
+    return True
+
+
+def extract_entities(text: str, mode: str = "auto") -> List[Dict]:
+    """Regex EMAIL/DATE/MONEY entities, plus spaCy NER per `mode` ("regex", "full" or "auto")."""
+    ents: List[Dict] = []
+    if not text:
+        return ents
+
+    nlp = _get_nlp() if _wants_spacy(text, mode) else None
+    if nlp is not None:
+        try:
+            ents.extend(_doc_entities(nlp(text)))
+        except Exception:
+            pass
+
+    # Fallback regexes
+    ents.extend(_regex_entities(text))
     return ents
+
+
+def extract_entities_batch(texts: List[str], mode: str = "auto") -> List[List[Dict]]:
+    """Same output as `extract_entities` per text, but runs spaCy NER over the batch with `nlp.pipe`."""
+    out: List[List[Dict]] = [[] for _ in texts]
+    idx = [i for i, t in enumerate(texts) if t and _wants_spacy(t, mode)]
+    nlp = _get_nlp() if idx else None
+    if nlp is not None:
+        try:
+            for i, doc in zip(idx, nlp.pipe((texts[i] for i in idx), batch_size=64)):
+                out[i].extend(_doc_entities(doc))
+        except Exception:
+            pass
+    for i, t in enumerate(texts):
+        if t:
+            out[i].extend(_regex_entities(t))
+    return out
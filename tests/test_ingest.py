@@ -0,0 +1,100 @@
+import email
+import email.policy
+import os
+
+import pytest
+
+import ingest.pst_extract
+from ingest.fast_parse import ParsedMsg
+from ingest.pst_extract import _ProgressLog, _ingest_stream, compute_external_id, parse_addrs
+
+
+class _Conn:
+    def __init__(self):
+        self.pending = 0
+        self.committed = 0
+
+    def commit(self):
+        self.committed += self.pending
+        self.pending = 0
+
+
+def test_interrupted_ingest_only_logs_committed_rows(tmp_path, monkeypatch):
+    conn = _Conn()
+
+    def fake_process(conn, cfg, msg, folder=None):
+        if msg == 1200:
+            raise KeyboardInterrupt
+        conn.pending += 1
+        return msg, ""
+
+    monkeypatch.setattr(ingest.pst_extract, "process_message", fake_process)
+    checkpoint = str(tmp_path / "state.json")
+    progress = _ProgressLog(checkpoint)
+    done = progress.state.setdefault("processed", {})
+    stream = ((i, f"m{i}.eml") for i in range(1500))
+    with pytest.raises(KeyboardInterrupt):
+        _ingest_stream(conn, {}, stream, done, progress, None)
+
+    assert conn.committed == 1000
+    # interpreter shutdown flushes whatever the open log file still buffers
+    progress._f.close()
+    reopened = _ProgressLog(checkpoint)
+    assert len(reopened.state["processed"]) == 1000
+    assert "m999.eml" in reopened.state["processed"]
+    assert "m1000.eml" not in reopened.state["processed"]
+
+
+def test_parse_addrs_prefers_angle_addr_over_display_text():
+    assert parse_addrs("\"'ceo@acme.com'\" <ceo@acme.com>") == ["ceo@acme.com"]
+    assert parse_addrs('"Smith, J (j@a.com)" <j@b.com>') == ["j@b.com"]
+    assert parse_addrs("Joe (joe@old.com) <joe@new.com>") == ["joe@new.com"]
+
+
+def test_parse_addrs_lists_and_bare_addresses():
+    assert parse_addrs("a@x.com, B <b@y.com>; c@z.com (C)") == ["a@x.com", "b@y.com", "c@z.com"]
+    assert parse_addrs("<a@x.com>, a@x.com") == ["a@x.com"]
+    assert parse_addrs(None) == []
+
+
+def test_fallback_external_id_is_parser_independent():
+    raw = b'From: "Smith, J"  <j@b.com>\r\nSubject: =?utf-8?q?caf=C3=A9?=\r\nDate: Tue,  1 Feb 2022 3:04:05 +0100 (CET)\r\n\r\nhi'
+    stdlib = email.message_from_bytes(raw, policy=email.policy.default)
+    # fast_mail_parser hands back decoded but otherwise raw header values
+    fast = ParsedMsg({"From": '"Smith, J"  <j@b.com>', "Date": "Tue,  1 Feb 2022 3:04:05 +0100 (CET)", "Subject": "café"}, "café", ["hi"], [], [])
+    assert compute_external_id(fast) == compute_external_id(stdlib)
+
+
+def test_readpst_ics_stores_every_event_in_a_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    events = []
+
+    def fake_readpst(pst_path, out_dir):
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, "cal.ics"), "w") as f:
+            for title in ("one", "two", "three"):
+                f.write(f"BEGIN:VEVENT\r\nSUMMARY:{title}\r\nDTSTART:20240101T100000Z\r\nEND:VEVENT\r\n")
+
+    monkeypatch.setattr(ingest.pst_extract, "run_readpst", fake_readpst)
+    monkeypatch.setattr(ingest.pst_extract, "insert_event", lambda conn, mid, kind, title, *rest: events.append(title))
+    checkpoint = str(tmp_path / "state.json")
+    ingest.pst_extract.ingest_with_readpst("x.pst", _Conn(), {}, checkpoint)
+    assert events == ["one", "two", "three"]
+
+    # a resumed run skips the checkpointed file
+    ingest.pst_extract.ingest_with_readpst("x.pst", _Conn(), {}, checkpoint)
+    assert events == ["one", "two", "three"]
+
+
+def test_failed_commit_does_not_advance_the_log(tmp_path):
+    class _Failing:
+        def commit(self):
+            raise OSError("disk full")
+
+    checkpoint = str(tmp_path / "state.json")
+    progress = _ProgressLog(checkpoint)
+    progress.record("processed", "m0.eml", 1)
+    with pytest.raises(OSError):
+        ingest.pst_extract._commit_batch(_Failing(), progress)
+    progress._f.close()
+    assert "processed" not in _ProgressLog(checkpoint).state
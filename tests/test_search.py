@@ -0,0 +1,56 @@
+import sqlite3
+
+import cli.search
+from cli.search import _query, _trigram_safe, ensure_fts
+
+
+def _db():
+    con = sqlite3.connect(":memory:")
+    con.execute(
+        "CREATE TABLE messages (id INTEGER PRIMARY KEY, sent_at TEXT, sender_email TEXT, "
+        "subject TEXT, body TEXT, account_tag TEXT)"
+    )
+    con.execute("INSERT INTO messages (sent_at, subject, body) VALUES ('2024-01-01', 'Invoice for Acme', 'pay now')")
+    con.commit()
+    return con
+
+
+def test_fts_backfills_and_tracks_inserts():
+    con = _db()
+    assert ensure_fts(con)
+    con.execute("INSERT INTO messages (sent_at, subject, body) VALUES ('2024-02-01', 'hello', 'contoso invoice')")
+    con.commit()
+    ids = [r[0] for r in _query(con, "invoice", 10)]
+    assert ids == [2, 1]
+    assert [r[0] for r in _query(con, "invoice AND contoso", 10)] == [2]
+
+
+def test_short_query_uses_like():
+    con = _db()
+    assert [r[0] for r in _query(con, "pa", 10)] == [1]
+
+
+def test_without_fts_matches_body_and_mid_subject(monkeypatch):
+    monkeypatch.setattr(cli.search, "ensure_fts", lambda con: False)
+    con = _db()
+    con.execute("INSERT INTO messages (sent_at, subject, body) VALUES ('2024-02-01', 'Re: invoice', 'x')")
+    con.execute("INSERT INTO messages (sent_at, subject, body) VALUES ('2024-03-01', 'hello', 'the invoice is attached')")
+    con.commit()
+    assert [r[0] for r in _query(con, "invoice", 10)] == [3, 2, 1]
+
+
+def test_short_terms_use_like():
+    con = _db()
+    assert ensure_fts(con)
+    con.execute("INSERT INTO messages (sent_at, subject, body) VALUES ('2024-02-01', 'annual report', 'x')")
+    con.execute("INSERT INTO messages (sent_at, subject, body) VALUES ('2024-03-01', 'Q3 report', 'ab cd')")
+    con.commit()
+    assert [r[0] for r in _query(con, "Q3 report", 10)] == [3]
+    assert [r[0] for r in _query(con, "ab cd", 10)] == [3]
+
+
+def test_trigram_routing_checks_every_term():
+    assert not _trigram_safe("Q3 AND report")
+    assert not _trigram_safe("PO")
+    assert _trigram_safe('"PO for" AND acme')
+    assert _trigram_safe("invoice OR contract")